@@ -1,5 +1,6 @@
 # bonus/aggregate_runs.py
 import argparse
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import re
 
@@ -23,12 +24,34 @@ def infer_clients(games):
         return names[0], names[1]
     return "CLIENT1", "CLIENT2"
 
+def _process_log(p: Path, baseline: float, k: float):
+    # one log -> one table row (None if it has no finished games);
+    # module-level so ProcessPoolExecutor can pickle it
+    games = parse_tournament_log(str(p))
+    if not games:
+        return None
+
+    c1, c2 = infer_clients(games)
+    r1, r2, w1, w2, n = compute_elo_from_games(games, c1, c2, baseline=baseline, k=k)
+
+    return {
+        "label": infer_label(p),
+        "file": p.name,
+        "games": n,
+        "c1": c1, "c2": c2,
+        "c1_wins": int(w1), "c2_wins": int(w2),
+        "c1_elo": r1, "c2_elo": r2,
+        "c1_delta": r1 - baseline,
+        "c2_delta": r2 - baseline,
+    }
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("logdir", help="Directory containing multiple tournament logs (ablation runs)")
     ap.add_argument("--glob", default="*.log")
     ap.add_argument("--k", type=float, default=40.0)
     ap.add_argument("--baseline", type=float, default=1500.0)
+    ap.add_argument("--jobs", type=int, default=None, help="Parallel parser processes (default: CPU count)")
     args = ap.parse_args()
 
     logdir = Path(args.logdir)
@@ -37,25 +60,13 @@ def main():
         print("No logs found.")
         return
 
+    # Logs are independent: parse them in parallel (map keeps file order)
     rows = []
-    for p in paths:
-        games = parse_tournament_log(str(p))
-        if not games:
-            continue
-
-        c1, c2 = infer_clients(games)
-        r1, r2, w1, w2, n = compute_elo_from_games(games, c1, c2, baseline=args.baseline, k=args.k)
-
-        rows.append({
-            "label": infer_label(p),
-            "file": p.name,
-            "games": n,
-            "c1": c1, "c2": c2,
-            "c1_wins": int(w1), "c2_wins": int(w2),
-            "c1_elo": r1, "c2_elo": r2,
-            "c1_delta": r1 - args.baseline,
-            "c2_delta": r2 - args.baseline,
-        })
+    with ProcessPoolExecutor(max_workers=args.jobs) as ex:
+        n = len(paths)
+        for row in ex.map(_process_log, paths, [args.baseline] * n, [args.k] * n):
+            if row is not None:
+                rows.append(row)
 
     # Print table
     print(f"{'Run':30} | {'Games':>5} | {'C1 wins':>7} | {'C2 wins':>7} | {'C1 ΔELO':>8} | {'C2 ΔELO':>8}")
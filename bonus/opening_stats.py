@@ -2,7 +2,7 @@
 import argparse
 from collections import defaultdict
 
-from tlog import parse_tournament_log
+from tlog import iter_tournament_games
 
 def main():
     ap = argparse.ArgumentParser()
@@ -11,31 +11,31 @@ def main():
     ap.add_argument("--top", type=int, default=15)
     args = ap.parse_args()
 
-    games = parse_tournament_log(args.logfile)
+    counts = defaultdict(int)
+    w_wins = defaultdict(int)
+    b_wins = defaultdict(int)
 
-    stats = defaultdict(lambda: {"count": 0, "white_wins": 0, "black_wins": 0})
-
-    for g in games:
+    # only the opening is needed: stop parsing each game's moves after --plies
+    for g in iter_tournament_games(args.logfile, max_plies_per_game=args.plies):
         seq = []
         for mv in g.moves[:args.plies]:
-            seq.append(f"{mv.frm}{mv.to}")
+            seq.append(f"{mv.frm_sq}{mv.to_sq}")
         key = " ".join(seq) if seq else "(empty)"
-        stats[key]["count"] += 1
+        counts[key] += 1
         if g.winner_side == "WHITE":
-            stats[key]["white_wins"] += 1
+            w_wins[key] += 1
         elif g.winner_side == "BLACK":
-            stats[key]["black_wins"] += 1
+            b_wins[key] += 1
 
     # Sort by frequency
-    items = sorted(stats.items(), key=lambda kv: kv[1]["count"], reverse=True)[:args.top]
+    items = sorted(counts.items(), key=lambda kv: kv[1], reverse=True)[:args.top]
 
     print(f"Top {args.top} openings by first {args.plies} plies\n")
     print(f"{'Count':>5} | {'W%':>6} | {'B%':>6} | Opening sequence")
     print("-" * 80)
-    for key, v in items:
-        c = v["count"]
-        w = v["white_wins"]
-        b = v["black_wins"]
+    for key, c in items:
+        w = w_wins[key]
+        b = b_wins[key]
         w_pct = 100.0 * w / c if c else 0.0
         b_pct = 100.0 * b / c if c else 0.0
         print(f"{c:5d} | {w_pct:5.1f}% | {b_pct:5.1f}% | {key}")
@@ -1,11 +1,11 @@
 # bonus/pawn_traj_viz.py
 import argparse
 from pathlib import Path
-from collections import defaultdict
 
 import matplotlib.pyplot as plt
+import numpy as np
 
-from tlog import parse_tournament_log, PawnBoard, sq_to_xy
+from tlog import iter_tournament_games, PawnBoard
 
 def draw_board(ax):
     ax.set_xlim(-0.5, 7.5)
@@ -17,23 +17,22 @@ def draw_board(ax):
     ax.grid(True)
     ax.set_aspect("equal")
 
-def save_heatmap(counts, out_png: Path, title: str):
-    fig, ax = plt.subplots(figsize=(6, 6))
+def save_heatmap(ax, counts, out_png: Path, title: str):
+    ax.clear()
     draw_board(ax)
-    # imshow expects [y][x]
-    mat = [[counts[(x, y)] for x in range(8)] for y in range(8)]
-    ax.imshow(mat, origin="lower", extent=(-0.5, 7.5, -0.5, 7.5), alpha=0.85)
+    # counts is already indexed [y, x], which is what imshow expects
+    ax.imshow(counts, origin="lower", extent=(-0.5, 7.5, -0.5, 7.5), alpha=0.85)
     ax.set_title(title)
+    fig = ax.figure
     fig.tight_layout()
     fig.savefig(out_png, dpi=200)
-    plt.close(fig)
 
-def save_game_trajectories(game, out_png: Path):
+def save_game_trajectories(ax, game, out_png: Path):
     board = PawnBoard()
     for mv in game.moves:
         board.apply(mv)
 
-    fig, ax = plt.subplots(figsize=(6, 6))
+    ax.clear()
     draw_board(ax)
     ax.set_title(f"Game {game.gid}: {game.white_player}(W) vs {game.black_player}(B) | winner={game.winner_side}")
 
@@ -41,14 +40,13 @@ def save_game_trajectories(game, out_png: Path):
     for pid, path in board.paths.items():
         if len(path) < 2:
             continue
-        pts = [sq_to_xy(sq) for sq in path]
-        xs = [p[0] for p in pts]
-        ys = [p[1] for p in pts]
+        xs = [sq & 7 for sq in path]
+        ys = [sq >> 3 for sq in path]
         ax.plot(xs, ys, marker="o", linewidth=1, alpha=0.8)
 
+    fig = ax.figure
     fig.tight_layout()
     fig.savefig(out_png, dpi=200)
-    plt.close(fig)
 
 def main():
     ap = argparse.ArgumentParser()
@@ -60,33 +58,34 @@ def main():
     outdir = Path(args.outdir)
     outdir.mkdir(parents=True, exist_ok=True)
 
-    games = parse_tournament_log(args.logfile)
-
-    # Aggregate heatmaps: count visits by square for WHITE/BLACK pawns
-    counts_w = defaultdict(int)
-    counts_b = defaultdict(int)
-
-    for g in games:
-        board = PawnBoard()
-        for mv in g.moves:
-            board.apply(mv)
-        for pid, path in board.paths.items():
-            for sq in path:
-                x, y = sq_to_xy(sq)
-                if pid.startswith("W_"):
-                    counts_w[(x, y)] += 1
-                else:
-                    counts_b[(x, y)] += 1
+    # Aggregate heatmaps: count visits by square for WHITE/BLACK pawns.
+    # Games are streamed; only the ones requested via --game are kept.
+    counts_w = np.zeros((8, 8), dtype=np.int64)
+    counts_b = np.zeros((8, 8), dtype=np.int64)
+    wanted = set(args.game or ())
+    by_id = {}
+
+    for g in iter_tournament_games(args.logfile):
+        if g.gid in wanted:
+            by_id[g.gid] = g
+        # square index = x + 8*y, so a flat 64-list reshapes to [y, x]
+        cw, cb = PawnBoard.visit_counts(g.moves)
+        counts_w += np.asarray(cw, dtype=np.int64).reshape(8, 8)
+        counts_b += np.asarray(cb, dtype=np.int64).reshape(8, 8)
+
+    # One Figure/Axes for every image; each save just clears and redraws.
+    fig, ax = plt.subplots(figsize=(6, 6))
 
-    save_heatmap(counts_w, outdir / "heatmap_white.png", "WHITE pawn square-visit heatmap (all games)")
-    save_heatmap(counts_b, outdir / "heatmap_black.png", "BLACK pawn square-visit heatmap (all games)")
+    save_heatmap(ax, counts_w, outdir / "heatmap_white.png", "WHITE pawn square-visit heatmap (all games)")
+    save_heatmap(ax, counts_b, outdir / "heatmap_black.png", "BLACK pawn square-visit heatmap (all games)")
 
     # Optional per-game trajectories
     if args.game:
-        by_id = {g.gid: g for g in games}
         for gid in args.game:
             if gid in by_id:
-                save_game_trajectories(by_id[gid], outdir / f"traj_game_{gid}.png")
+                save_game_trajectories(ax, by_id[gid], outdir / f"traj_game_{gid}.png")
+
+    plt.close(fig)
 
     print(f"Saved: {outdir / 'heatmap_white.png'}")
     print(f"Saved: {outdir / 'heatmap_black.png'}")
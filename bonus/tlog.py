@@ -1,36 +1,75 @@
 # bonus/tlog.py
 from __future__ import annotations
+import math
+import mmap
 import re
 from dataclasses import dataclass, field
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Iterator, Optional, Tuple
 from collections import defaultdict
 
 MOVE_RE = re.compile(r'^\[MOVE\]\s+ply=(\d+)\s+(WHITE|BLACK)\s+->\s+([a-h][1-8])([a-h][1-8])\s*$')
 GAME_RE = re.compile(r'^\[GAME\s+(\d+)\]\s+white=(\S+)\s+black=(\S+)\s*$')
 END_RE  = re.compile(r'^\[END\]\s+RESIGNATION\s+by\s+(WHITE|BLACK)\s+at\s+ply\s+(\d+)\s+\|\s+winner=(WHITE|BLACK)\s*$')
 
+# Single-pass scanner over the whole (mmap'd) log: finds every GAME/MOVE/END
+# event line in one sweep instead of three match attempts per line.
+# The pattern opens with a bare "[" literal (no ^ anchor) so the regex engine
+# can skip straight to candidate brackets instead of trying every line start;
+# the tag letter after it selects the branch, and the line-start check is done
+# in Python on the (rare) hits. A match is just the rest of the line; fields
+# are sliced/split out in Python, with the per-line regexes above as fallback.
+EVENT_RE = re.compile(rb'\[(?:GAME[^\S\n]|MOVE\]|END\])[^\n]*')
+
+_TAG_MOVE = ord("M")
+_TAG_GAME = ord("G")
+_NL = ord("\n")
+
 FILES = "abcdefgh"
 
+# Square name <-> coordinate tables (64 entries each), so conversions are a
+# single lookup instead of FILES.index + int() per call.
+SQ_NAMES = [f"{f}{r + 1}" for r in range(8) for f in FILES]  # index x + 8*y
+SQ_XY = {sq: (i & 7, i >> 3) for i, sq in enumerate(SQ_NAMES)}
+SQ_IDX = {sq: i for i, sq in enumerate(SQ_NAMES)}
+
+# b"e2" -> 12: validates a square and yields its index without decoding
+_SQUARES = {sq.encode("ascii"): i for i, sq in enumerate(SQ_NAMES)}
+_SIDES = {b"WHITE": "WHITE", b"BLACK": "BLACK"}
+_MOVE_PREFIX_LEN = len(b"[MOVE] ply=")
+
 def sq_to_xy(sq: str) -> Tuple[int, int]:
     # a1 -> (0,0), h8 -> (7,7)
-    f = FILES.index(sq[0])
-    r = int(sq[1]) - 1
-    return f, r
+    return SQ_XY[sq]
 
 def xy_to_sq(x: int, y: int) -> str:
-    return f"{FILES[x]}{y+1}"
+    return SQ_NAMES[x + 8 * y]
+
+# Square index: file + 8*rank, a1 = 0, h8 = 63
+def sq_to_idx(sq: str) -> int:
+    return SQ_IDX[sq]
+
+def idx_to_sq(idx: int) -> str:
+    return SQ_NAMES[idx]
 
 def is_promo_square(side: str, sq: str) -> bool:
     # Side is "WHITE" or "BLACK"
     rank = int(sq[1])
     return (side == "WHITE" and rank == 8) or (side == "BLACK" and rank == 1)
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Move:
     ply: int
     side: str   # "WHITE" or "BLACK"
-    frm: str
-    to: str
+    frm: int    # square index (see sq_to_idx)
+    to: int
+
+    @property
+    def frm_sq(self) -> str:
+        return idx_to_sq(self.frm)
+
+    @property
+    def to_sq(self) -> str:
+        return idx_to_sq(self.to)
 
 @dataclass
 class Game:
@@ -42,49 +81,160 @@ class Game:
     winner_side: Optional[str] = None   # "WHITE"/"BLACK"
     end_ply: Optional[int] = None
 
-def parse_tournament_log(path: str) -> List[Game]:
-    games: List[Game] = []
-    cur: Optional[Game] = None
+def _parse_move_line(line: bytes) -> Optional[Move]:
+    # slow path for [MOVE] lines the fixed-offset slicing couldn't handle
+    m = MOVE_RE.match(line.decode("utf-8", errors="replace"))
+    if m is None:
+        return None
+    return Move(ply=int(m.group(1)), side=m.group(2), frm=sq_to_idx(m.group(3)), to=sq_to_idx(m.group(4)))
+
+def _parse_game_line(line: bytes) -> Optional[Tuple[int, str, str]]:
+    # "[GAME <N>] white=<X> black=<Y>" -> (gid, white, black)
+    parts = line.split()
+    if (len(parts) == 4 and parts[0] == b"[GAME" and parts[1][-1:] == b"]" and parts[1][:-1].isdigit()
+            and parts[2][:6] == b"white=" and len(parts[2]) > 6
+            and parts[3][:6] == b"black=" and len(parts[3]) > 6):
+        return (int(parts[1][:-1]),
+                parts[2][6:].decode("utf-8", errors="replace"),
+                parts[3][6:].decode("utf-8", errors="replace"))
+
+    m = GAME_RE.match(line.decode("utf-8", errors="replace"))
+    if m is None:
+        return None
+    return int(m.group(1)), m.group(2), m.group(3)
+
+def _parse_end_line(line: bytes) -> Optional[Tuple[str, int, str]]:
+    # "[END] RESIGNATION by <SIDE> at ply <N> | winner=<SIDE>" -> (resign_by, end_ply, winner)
+    parts = line.split()
+    if (len(parts) == 9 and parts[:3] == [b"[END]", b"RESIGNATION", b"by"]
+            and parts[4:6] == [b"at", b"ply"] and parts[6].isdigit() and parts[7] == b"|"
+            and parts[8][:7] == b"winner="):
+        resign_by = _SIDES.get(parts[3])
+        winner = _SIDES.get(parts[8][7:])
+        if resign_by is not None and winner is not None:
+            return resign_by, int(parts[6]), winner
+
+    m = END_RE.match(line.decode("utf-8", errors="replace"))
+    if m is None:
+        return None
+    return m.group(1), int(m.group(2)), m.group(3)
+
+READ_CHUNK = 1 << 20
+
+def _iter_log_buffers(path: str) -> Iterator[bytes]:
+    """
+    Yield the raw log as byte buffers that each end on a line boundary.
+    Regular files are mmap'd whole (one buffer); anything mmap refuses
+    (empty file, pipe, /dev/stdin) is read in 1 MiB chunks instead of the
+    default 8 KiB, carrying the partial last line over to the next chunk.
+    """
+    with open(path, "rb", buffering=READ_CHUNK) as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            mm = None
+
+        if mm is not None:
+            with mm:
+                yield mm
+            return
 
-    with open(path, "r", encoding="utf-8", errors="replace") as f:
-        for line in f:
-            line = line.rstrip("\n")
+        tail = b""
+        while True:
+            chunk = f.read(READ_CHUNK)
+            if not chunk:
+                break
+            buf = tail + chunk
+            cut = buf.rfind(b"\n") + 1
+            if cut:
+                yield buf[:cut]
+            tail = buf[cut:]
+        if tail:
+            yield tail
+
+def iter_tournament_games(path: str, max_plies_per_game: Optional[int] = None) -> Iterator[Game]:
+    """
+    Stream finished games out of a tournament log one at a time; a game is
+    yielded once the next [GAME] header (or EOF) closes it. Games that never
+    got an [END] line are skipped.
 
-            m = GAME_RE.match(line)
-            if m:
-                if cur is not None:
-                    games.append(cur)
-                cur = Game(gid=int(m.group(1)), white_player=m.group(2), black_player=m.group(3))
-                continue
+    max_plies_per_game: keep only the first N moves of each game; the rest of
+    that game's [MOVE] lines are skipped without being parsed.
+    """
+    cap = -1 if max_plies_per_game is None else max_plies_per_game
+    cur: Optional[Game] = None
+    skip_moves = True  # no open game yet, or cap reached
 
-            m = MOVE_RE.match(line)
-            if m and cur is not None:
-                cur.moves.append(Move(
-                    ply=int(m.group(1)),
-                    side=m.group(2),
-                    frm=m.group(3),
-                    to=m.group(4),
-                ))
+    for buf in _iter_log_buffers(path):
+        for m in EVENT_RE.finditer(buf):
+            pos = m.start()
+            if pos and buf[pos - 1] != _NL:
+                # "[" in the middle of a line, not an event
                 continue
 
-            m = END_RE.match(line)
-            if m and cur is not None:
-                cur.resign_by = m.group(1)
-                cur.end_ply = int(m.group(2))
-                cur.winner_side = m.group(3)
+            tag = buf[pos + 1]
+            if tag == _TAG_MOVE:
+                if skip_moves:
+                    continue
+                # Rigid "[MOVE] ply=<N> <SIDE> -> <from><to>" shape: fixed
+                # offsets + dict lookups instead of regex groups/decodes.
+                line = m.group()
+                mv = None
+                sp = line.find(b" ", _MOVE_PREFIX_LEN)
+                side = _SIDES.get(line[sp + 1:sp + 6])
+                if side is not None and line[sp + 6:sp + 10] == b" -> ":
+                    frm = _SQUARES.get(line[sp + 10:sp + 12])
+                    to = _SQUARES.get(line[sp + 12:sp + 14])
+                    ply = line[_MOVE_PREFIX_LEN:sp]
+                    if frm is not None and to is not None and ply.isdigit() and not line[sp + 14:].strip():
+                        mv = Move(ply=int(ply), side=side, frm=frm, to=to)
+                if mv is None:
+                    mv = _parse_move_line(line)
+                if mv is not None:
+                    cur.moves.append(mv)
+                    skip_moves = len(cur.moves) == cap
+            elif tag == _TAG_GAME:
+                hdr = _parse_game_line(m.group())
+                if hdr is None:
+                    continue
+                if cur is not None and cur.winner_side is not None:
+                    yield cur
+                cur = Game(gid=hdr[0], white_player=hdr[1], black_player=hdr[2])
+                skip_moves = cap == 0
+            elif cur is not None:
+                end = _parse_end_line(m.group())
+                if end is None:
+                    continue
+                cur.resign_by, cur.end_ply, cur.winner_side = end
                 # keep cur open until next GAME or EOF
-                continue
 
-    if cur is not None:
-        games.append(cur)
+    if cur is not None and cur.winner_side is not None:
+        yield cur
 
-    # Drop any incomplete games that never ended (optional)
-    games = [g for g in games if g.winner_side is not None]
-    return games
+def parse_tournament_log(path: str, max_plies_per_game: Optional[int] = None) -> List[Game]:
+    return list(iter_tournament_games(path, max_plies_per_game))
 
 # --------------------------
 # Minimal pawn-only board
 # --------------------------
+_WHITE, _BLACK = 1, 2
+
+def _ep_victims(forward: int) -> List[int]:
+    # (frm << 6 | to) -> square apply()'s en-passant heuristic clears when a
+    # pawn moving `forward` ranks lands diagonally on an empty square, else -1
+    table = [-1] * 4096
+    for frm in range(64):
+        fx, fy = frm & 7, frm >> 3
+        ty = fy + forward
+        if not 0 <= ty < 8:
+            continue
+        for tx in (fx - 1, fx + 1):
+            if 0 <= tx < 8:
+                table[(frm << 6) | (tx + 8 * ty)] = tx + 8 * fy
+    return table
+
+_EP_VICTIM = (None, _ep_victims(1), _ep_victims(-1))  # indexed by _WHITE/_BLACK
+
 class PawnBoard:
     """
     Assumes standard pawn starts:
@@ -97,22 +247,23 @@ class PawnBoard:
     Enough for trajectory visualization & opening stats.
     """
     def __init__(self):
-        self.occ: Dict[str, Tuple[str, str]] = {}  # sq -> (side, pawn_id)
-        self.paths: Dict[str, List[str]] = defaultdict(list)
-        self.last_move: Optional[Tuple[str, str, str]] = None  # (side, frm, to)
+        # squares are indices (see sq_to_idx)
+        self.occ: Dict[int, Tuple[str, str]] = {}  # sq -> (side, pawn_id)
+        self.paths: Dict[str, List[int]] = defaultdict(list)
+        self.last_move: Optional[Tuple[str, int, int]] = None  # (side, frm, to)
 
         # init pawns
         for x, f in enumerate(FILES):
-            w = f"{f}2"
-            b = f"{f}7"
-            wid = f"W_{w}"
-            bid = f"B_{b}"
+            w = x + 8
+            b = x + 48
+            wid = f"W_{f}2"
+            bid = f"B_{f}7"
             self.occ[w] = ("WHITE", wid)
             self.occ[b] = ("BLACK", bid)
             self.paths[wid].append(w)
             self.paths[bid].append(b)
 
-    def _remove(self, sq: str):
+    def _remove(self, sq: int):
         if sq in self.occ:
             del self.occ[sq]
 
@@ -136,15 +287,15 @@ class PawnBoard:
             self._remove(to)
 
         # En-passant heuristic: diagonal move to empty square
-        fx, fy = sq_to_xy(frm)
-        tx, ty = sq_to_xy(to)
+        fx, fy = frm & 7, frm >> 3
+        tx, ty = to & 7, to >> 3
         if (to not in self.occ) and (abs(tx - fx) == 1):
             # white captures "up", black captures "down"
             if side == "WHITE" and (ty - fy) == 1:
-                captured_sq = xy_to_sq(tx, fy)  # e.g., f5->e6 captures e5
+                captured_sq = tx + 8 * fy  # e.g., f5->e6 captures e5
                 self._remove(captured_sq)
             if side == "BLACK" and (fy - ty) == 1:
-                captured_sq = xy_to_sq(tx, fy)  # e.g., e4->f3 captures f4
+                captured_sq = tx + 8 * fy  # e.g., e4->f3 captures f4
                 self._remove(captured_sq)
 
         # Move pawn
@@ -154,14 +305,49 @@ class PawnBoard:
 
         self.last_move = (side, frm, to)
 
+    @staticmethod
+    def visit_counts(moves: List[Move]) -> Tuple[List[int], List[int]]:
+        """
+        Square-visit counts (white, black), 64 entries indexed like sq_to_idx,
+        for one game from the standard start. Same rules as apply(), but only
+        tracks which side sits on each square (no pawn ids, no paths), which
+        is all the aggregate heatmap needs.
+        """
+        board = bytearray(64)
+        board[8:16] = bytes([_WHITE]) * 8
+        board[48:56] = bytes([_BLACK]) * 8
+        counts = (
+            None,
+            [1 if 8 <= sq < 16 else 0 for sq in range(64)],    # _WHITE
+            [1 if 48 <= sq < 56 else 0 for sq in range(64)],   # _BLACK
+        )
+
+        for mv in moves:
+            me = _WHITE if mv.side == "WHITE" else _BLACK
+            frm, to = mv.frm, mv.to
+            if board[frm] != me:
+                continue
+
+            t = board[to]
+            if t and t != me:
+                board[to] = t = 0
+            if not t:
+                ep = _EP_VICTIM[me][(frm << 6) | to]
+                if ep >= 0:
+                    board[ep] = 0
+
+            board[frm] = 0
+            board[to] = me
+            counts[me][to] += 1
+
+        return counts[_WHITE], counts[_BLACK]
+
 def compute_elo_from_games(games: List[Game], client1: str, client2: str, baseline=1500.0, k=40.0):
     """
     Returns final (r1,r2), plus win stats.
     """
-    r = {client1: baseline, client2: baseline}
-    w = {client1: 0.0, client2: 0.0}
-    n = 0
-
+    # First pass: reduce each game to "did client1 win?".
+    c1_won: List[bool] = []
     for g in games:
         # map winner side -> player name
         if g.winner_side == "WHITE":
@@ -169,22 +355,26 @@ def compute_elo_from_games(games: List[Game], client1: str, client2: str, baseli
         else:
             winner = g.black_player
 
-        if winner not in r:
-            # ignore games with unexpected player names
-            continue
-
-        loser = client2 if winner == client1 else client1
-        n += 1
-        w[winner] += 1.0
-
-        ra, rb = r[client1], r[client2]
-        ea = 1.0 / (1.0 + 10 ** ((rb - ra) / 400.0))
-        eb = 1.0 - ea
-
-        sa = 1.0 if winner == client1 else 0.0
-        sb = 1.0 - sa
-
-        r[client1] = ra + k * (sa - ea)
-        r[client2] = rb + k * (sb - eb)
+        if winner == client1:
+            c1_won.append(True)
+        elif winner == client2:
+            c1_won.append(False)
+        # else: ignore games with unexpected player names
+
+    # Elo is path-dependent, so this stays a sequential loop, but on plain
+    # local floats (no dict lookups, pow bound locally).
+    pow_ = math.pow
+    ra = rb = float(baseline)
+    w1 = 0.0
+    for won in c1_won:
+        ea = 1.0 / (1.0 + pow_(10.0, (rb - ra) / 400.0))
+        if won:
+            w1 += 1.0
+            d = k * (1.0 - ea)
+        else:
+            d = -k * ea
+        # eb = 1 - ea and sb = 1 - sa, so client2 moves by exactly -d
+        ra, rb = ra + d, rb - d
 
-    return r[client1], r[client2], w[client1], w[client2], n
+    n = len(c1_won)
+    return ra, rb, w1, n - w1, n
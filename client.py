@@ -1,8 +1,10 @@
 import argparse
+import heapq
 import random
 import socket
 import time
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import List, Optional, Tuple
 
 FILES = "abcdefgh"
@@ -10,14 +12,17 @@ RANKS = "12345678"
 PROMO_CHARS = set("qQrRbBnN")  # allow common promotion suffixes
 
 
+# 64-entry lookup tables; SQ_NAMES is indexed by x + 8*y (same as the bitboards)
+SQ_NAMES = [f + r for r in RANKS for f in FILES]
+SQ_XY = {sq: (i & 7, i >> 3) for i, sq in enumerate(SQ_NAMES)}
+
+
 def sq_to_xy(sq: str) -> Tuple[int, int]:
-    f = FILES.index(sq[0])
-    r = RANKS.index(sq[1])
-    return f, r
+    return SQ_XY[sq]
 
 
 def xy_to_sq(x: int, y: int) -> str:
-    return f"{FILES[x]}{RANKS[y]}"
+    return SQ_NAMES[x + 8 * y]
 
 
 def is_move(s: str) -> bool:
@@ -56,9 +61,76 @@ class Move:
         return xy_to_sq(self.fx, self.fy) + xy_to_sq(self.tx, self.ty)
 
 
+# Bitboard layout: bit (8*y + x) <=> square (x, y); a1 = bit 0, h8 = bit 63.
+BB_ALL = (1 << 64) - 1
+FILE_A = 0x0101010101010101
+FILE_H = FILE_A << 7
+NOT_A_FILE = BB_ALL ^ FILE_A
+NOT_H_FILE = BB_ALL ^ FILE_H
+RANK_3 = 0xFF << 16
+RANK_6 = 0xFF << 40
+
+
+def bit_of(x: int, y: int) -> int:
+    return 1 << (8 * y + x)
+
+
+# Positions recur a lot (shared openings, transpositions) and the key is tiny
+# (two bitboards, side, variant flag), so move lists are memoized. Values are tuples so a
+# cached list can't be mutated by a caller.
+@lru_cache(maxsize=1 << 16)
+def legal_moves(w: int, b: int, side: str, diag_empty: bool = False) -> Tuple[Move, ...]:
+    empty = ~(w | b) & BB_ALL
+
+    # Destination sets for every pawn at once; per-pawn work below is
+    # just bit tests. Order: by source square a1..h8, then forward 1,
+    # forward 2, diagonal left, diagonal right.
+    if side == "W":
+        own, opp = w, b
+        push1 = (own << 8) & empty
+        push2 = ((push1 & RANK_3) << 8) & empty
+        targets = opp | empty if diag_empty else opp
+        cap_l = (own << 7) & NOT_H_FILE & targets
+        cap_r = (own << 9) & NOT_A_FILE & targets
+        d1, dl, dr = 8, 7, 9
+    else:
+        own, opp = b, w
+        push1 = (own >> 8) & empty
+        push2 = ((push1 & RANK_6) >> 8) & empty
+        targets = opp | empty if diag_empty else opp
+        cap_l = (own >> 9) & NOT_H_FILE & targets
+        cap_r = (own >> 7) & NOT_A_FILE & targets
+        d1, dl, dr = -8, -9, -7
+
+    moves: List[Move] = []
+    bb = own
+    while bb:
+        lsb = bb & -bb
+        src = lsb.bit_length() - 1
+        bb ^= lsb
+        x, y = src & 7, src >> 3
+
+        dst = src + d1
+        if dst >= 0 and (push1 >> dst) & 1:
+            moves.append(Move(x, y, x, dst >> 3))
+            dst2 = dst + d1
+            if dst2 >= 0 and (push2 >> dst2) & 1:
+                moves.append(Move(x, y, x, dst2 >> 3))
+
+        dst = src + dl
+        if dst >= 0 and (cap_l >> dst) & 1:
+            moves.append(Move(x, y, x - 1, dst >> 3))
+        dst = src + dr
+        if dst >= 0 and (cap_r >> dst) & 1:
+            moves.append(Move(x, y, x + 1, dst >> 3))
+
+    return tuple(moves)
+
+
 class PawnBoard:
     """
-    Pawn-only chess board.
+    Pawn-only chess board, stored as two 64-bit occupancy bitboards
+    (self.w / self.b, bit 8*y+x).
 
     DEFAULT RULES (standard pawns):
       - forward 1 to empty
@@ -70,19 +142,17 @@ class PawnBoard:
     """
     def __init__(self, diag_empty: bool = False) -> None:
         self.diag_empty = diag_empty
-        self.grid: List[List[Optional[str]]] = [[None for _ in range(8)] for _ in range(8)]
+        self.w = 0
+        self.b = 0
         self.reset_to_start()
 
     def clear(self) -> None:
-        for y in range(8):
-            for x in range(8):
-                self.grid[y][x] = None
+        self.w = 0
+        self.b = 0
 
     def reset_to_start(self) -> None:
-        self.clear()
-        for x in range(8):
-            self.grid[1][x] = "W"
-            self.grid[6][x] = "B"
+        self.w = 0xFF << 8    # rank 2
+        self.b = 0xFF << 48   # rank 7
 
     def load_from_setup(self, tokens: List[str]) -> None:
         self.clear()
@@ -94,94 +164,86 @@ class PawnBoard:
             if c not in ("W", "B"):
                 continue
             x, y = sq_to_xy(sq)
-            self.grid[y][x] = c
+            self.set_piece(x, y, c)
 
     def piece_at(self, x: int, y: int) -> Optional[str]:
-        return self.grid[y][x]
+        bit = bit_of(x, y)
+        if self.w & bit:
+            return "W"
+        if self.b & bit:
+            return "B"
+        return None
 
     def set_piece(self, x: int, y: int, p: Optional[str]) -> None:
-        self.grid[y][x] = p
-
-    def legal_moves(self, side: str) -> List[Move]:
-        opp = "B" if side == "W" else "W"
-        diry = 1 if side == "W" else -1
-        start_rank = 1 if side == "W" else 6
-
-        moves: List[Move] = []
-        for y in range(8):
-            for x in range(8):
-                if self.grid[y][x] != side:
-                    continue
-
-                ny = y + diry
-                if not (0 <= ny < 8):
-                    continue
-
-                # forward 1
-                if self.grid[ny][x] is None:
-                    moves.append(Move(x, y, x, ny))
-
-                    # forward 2
-                    if y == start_rank:
-                        ny2 = y + 2 * diry
-                        if 0 <= ny2 < 8 and self.grid[ny2][x] is None:
-                            moves.append(Move(x, y, x, ny2))
-
-                # diagonal 1
-                for dx in (-1, 1):
-                    nx = x + dx
-                    if not (0 <= nx < 8):
-                        continue
-                    target = self.grid[ny][nx]
-                    if target == opp:
-                        moves.append(Move(x, y, nx, ny))
-                    elif self.diag_empty and target is None:
-                        moves.append(Move(x, y, nx, ny))
-
-        return moves
+        bit = bit_of(x, y)
+        self.w &= ~bit
+        self.b &= ~bit
+        if p == "W":
+            self.w |= bit
+        elif p == "B":
+            self.b |= bit
+
+    def legal_moves(self, side: str) -> Tuple[Move, ...]:
+        return legal_moves(self.w, self.b, side, self.diag_empty)
 
     def apply_move(self, mv: Move, side: str) -> bool:
         fx, fy, tx, ty = mv.fx, mv.fy, mv.tx, mv.ty
-        piece = self.piece_at(fx, fy)
-        if piece != side:
+        if not (0 <= fx < 8 and 0 <= fy < 8 and 0 <= tx < 8 and 0 <= ty < 8):
             return False
+        src = bit_of(fx, fy)
+        dst = bit_of(tx, ty)
 
-        opp = "B" if side == "W" else "W"
-        diry = 1 if side == "W" else -1
-        start_rank = 1 if side == "W" else 6
+        if side == "W":
+            own, opp = self.w, self.b
+            diry, start_rank = 1, 1
+        else:
+            own, opp = self.b, self.w
+            diry, start_rank = -1, 6
+        if not own & src:
+            return False
 
         dx = tx - fx
         dy = ty - fy
+        occ = own | opp
 
         # forward
         if dx == 0:
             if dy not in (diry, 2 * diry):
                 return False
-            if self.piece_at(tx, ty) is not None:
+            if occ & dst:
                 return False
             if dy == 2 * diry:
                 if fy != start_rank:
                     return False
-                midy = fy + diry
-                if self.piece_at(tx, midy) is not None:
+                if occ & bit_of(tx, fy + diry):
                     return False
 
         # diagonal
         elif abs(dx) == 1 and dy == diry:
-            target = self.piece_at(tx, ty)
-            if target == side:
-                return False
-            if target is None and not self.diag_empty:
+            if own & dst:
                 return False
-            if target is not None and target != opp:
+            if not opp & dst and not self.diag_empty:
                 return False
         else:
             return False
 
-        self.set_piece(fx, fy, None)
-        self.set_piece(tx, ty, side)
+        self.apply_legal(mv, side)
         return True
 
+    def apply_legal(self, mv: Move, side: str) -> None:
+        """
+        Commit a move already known to be legal (e.g. taken from
+        legal_moves on this same board) without re-validating it.
+        """
+        src = bit_of(mv.fx, mv.fy)
+        dst = bit_of(mv.tx, mv.ty)
+        if side == "W":
+            self.w ^= src | dst
+            self.b &= ~dst
+        else:
+            self.b ^= src | dst
+            self.w &= ~dst
+
     def apply_move_str(self, s: str, side: str) -> bool:
         s = move_core(s)
         fx, fy = sq_to_xy(s[:2])
@@ -211,11 +273,10 @@ def pick_move(board: PawnBoard, side: str, rng: random.Random) -> Optional[Move]
     if caps:
         return rng.choice(caps)
 
-    def score(m: Move) -> int:
-        return m.ty if side == "W" else (7 - m.ty)
-
-    moves.sort(key=score, reverse=True)
-    top = moves[: min(12, len(moves))]
+    # most advanced 12 destinations; nlargest == sorted(..., reverse=True)[:12]
+    # (ties keep generation order) without sorting the whole list
+    sign = 1 if side == "W" else -1
+    top = heapq.nlargest(12, moves, key=lambda m: sign * m.ty)
     return rng.choice(top)
 
 
@@ -339,7 +400,8 @@ def main() -> int:
 
         if msg == "Begin":
             my_side = "W"
-            t0 = time.perf_counter()
+            # only clock the reply when the server gave us a time budget
+            t0 = time.perf_counter() if time_left_sec is not None else 0.0
 
             mv_obj = pick_move(board, my_side, rng)
             if mv_obj is None:
@@ -349,7 +411,7 @@ def main() -> int:
                 use_promo = (not promo_forced_off) and (promo_forced_on or server_uses_promo)
                 out = maybe_add_promo(mv4, my_side, use_promo, promo_char)
 
-                board.apply_move_str(out, my_side)
+                board.apply_legal(mv_obj, my_side)
                 io.send_line(out)
 
             if time_left_sec is not None:
@@ -380,7 +442,8 @@ def main() -> int:
                 board.force_apply_move_str(msg, opp)
 
             # Our reply
-            t0 = time.perf_counter()
+            # only clock the reply when the server gave us a time budget
+            t0 = time.perf_counter() if time_left_sec is not None else 0.0
 
             mv_obj = pick_move(board, my_side, rng)
             if mv_obj is None:
@@ -389,25 +452,12 @@ def main() -> int:
 
             use_promo = (not promo_forced_off) and (promo_forced_on or server_uses_promo)
 
-            sent = False
-            for _ in range(10):
-                mv4 = mv_obj.to_str()
-                out = maybe_add_promo(mv4, my_side, use_promo, promo_char)
-
-                if board.apply_move_str(out, my_side):
-                    io.send_line(out)
-                    sent = True
-                    break
-
-                legals = board.legal_moves(my_side)
-                if not legals:
-                    io.send_line("exit")
-                    sent = True
-                    break
-                mv_obj = rng.choice(legals)
-
-            if not sent:
-                io.send_line("exit")
+            # pick_move only returns moves from legal_moves on this board,
+            # so there's nothing to re-validate or retry.
+            mv4 = mv_obj.to_str()
+            out = maybe_add_promo(mv4, my_side, use_promo, promo_char)
+            board.apply_legal(mv_obj, my_side)
+            io.send_line(out)
 
             if time_left_sec is not None:
                 time_left_sec -= (time.perf_counter() - t0)
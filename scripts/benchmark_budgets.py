@@ -6,7 +6,7 @@ import time
 from dataclasses import dataclass
 from typing import List, Optional, Tuple
 
-from twoflags.game import Position, apply_move, winner, generate_moves
+from twoflags.game import Position, Color, W, B, apply_move, winner, generate_moves
 from twoflags.agents.ab_agent import choose_move_iterdeep
 from twoflags.agents.random_agent import choose_move as choose_random_move
 
@@ -27,10 +27,10 @@ def play_game(
     rng: random.Random,
     opening_random_plies: int = 2,
     max_plies: int = 500,
-) -> Tuple[Optional[str], int]:
+) -> Tuple[Optional[Color], int]:
     """
     Returns (winner_color or None, plies_played).
-    Winner_color is 'W' or 'B'.
+    Winner_color is W or B.
     """
     pos = Position.initial()
 
@@ -43,7 +43,7 @@ def play_game(
         if ply < opening_random_plies:
             mv = choose_random_move(pos, rng=rng)
         else:
-            budget = budget_white if pos.turn == "W" else budget_black
+            budget = budget_white if pos.turn == W else budget_black
             mv = choose_move_iterdeep(pos, time_budget_sec=budget)
 
         pos = apply_move(pos, mv)
@@ -86,7 +86,7 @@ def run_benchmark(
                     rng=rng,
                     opening_random_plies=opening_random_plies,
                 )
-                bench_color = "W"
+                bench_color = W
             else:
                 w, plies = play_game(
                     budget_white=baseline,
@@ -94,7 +94,7 @@ def run_benchmark(
                     rng=rng,
                     opening_random_plies=opening_random_plies,
                 )
-                bench_color = "B"
+                bench_color = B
 
             res.games += 1
             res.total_plies += plies
@@ -25,37 +25,30 @@ def random_position(random_plies: int, rng: random.Random) -> Position:
 def solve_effective_branching_factor(nodes: int, depth: int) -> float:
     """
     Solve for b in: N ≈ 1 + b + b^2 + ... + b^depth  (uniform tree approximation)
-    using binary search. Returns b.
+    using Newton's method. Returns b.
 
     Notes:
-    - Our node counter typically does not include the root, so we use nodes+1.
+    - The agent's node counter includes the root, so N = nodes.
+    - Multiplying out by (b-1) gives f(b) = b^(d+1) - N*(b-1) - 1 = 0. f is convex,
+      and N^(1/d) lies above the root (N > b^d), so Newton started there
+      decreases monotonically onto it instead of drifting to the trivial root b=1.
     """
     if depth <= 0:
         return 0.0
-    N = max(1, nodes + 1)
+    N = max(1, nodes)
 
     # If N is extremely small, branching is ~1
     if N <= depth + 1:
         return 1.0
 
-    def series(b: float) -> float:
-        # (b^(d+1)-1)/(b-1)
-        return (b ** (depth + 1) - 1.0) / (b - 1.0)
-
-    lo, hi = 1.000001, 200.0
-    # Ensure hi is high enough
-    while series(hi) < N:
-        hi *= 2.0
-        if hi > 1e6:
+    b = N ** (1.0 / depth)
+    for _ in range(100):
+        bd = b ** depth
+        step = (bd * b - N * (b - 1.0) - 1.0) / ((depth + 1) * bd - N)
+        b -= step
+        if step <= b * 1e-12:
             break
-
-    for _ in range(60):
-        mid = (lo + hi) / 2.0
-        if series(mid) < N:
-            lo = mid
-        else:
-            hi = mid
-    return (lo + hi) / 2.0
+    return b
 
 
 def run_agent_one_move_stats(pos: Position, budget: float, max_depth: int, keep_tt: bool) -> Tuple[int, int]:
@@ -70,18 +63,19 @@ def run_agent_one_move_stats(pos: Position, budget: float, max_depth: int, keep_
         ab.reset_tt()
 
     ab.NODES = 0  # reset per-move node counter
+    ab.reset_move_ordering()
 
-    start = time.time()
+    deadline = time.perf_counter() + budget
     depth = 1
     best = None
 
-    while depth <= max_depth:
-        if time.time() - start > budget:
-            break
-
-        mv, _val = ab._search_depth(pos, depth, start, budget)
+    while depth <= max_depth and time.perf_counter() < deadline:
+        mv, val = ab._search_depth(pos, depth, deadline)
         if mv is not None:
             best = mv
+        if val is None:
+            # deadline hit mid-iteration: this depth was not completed
+            break
 
         depth += 1
 
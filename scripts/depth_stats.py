@@ -1,17 +1,20 @@
+import mmap
 import re
 import statistics
 import sys
 
 path = sys.argv[1] if len(sys.argv) > 1 else "run_with_depth.log"
 
-pat = re.compile(r"\[ID\]\s+reached_depth=(\d+)")
-depths = []
+pat = re.compile(rb"\[ID\]\s+reached_depth=(\d+)")
 
-with open(path, "r", encoding="utf-8", errors="ignore") as f:
-    for line in f:
-        m = pat.search(line)
-        if m:
-            depths.append(int(m.group(1)))
+# one regex pass over the mapped file instead of a search per line
+with open(path, "rb") as f:
+    try:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            depths = [int(x) for x in pat.findall(mm)]
+    except ValueError:
+        # empty file: nothing to map
+        depths = []
 
 if not depths:
     print("No [ID] reached_depth lines found.")
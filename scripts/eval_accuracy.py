@@ -1,19 +1,21 @@
 from __future__ import annotations
 
 import argparse
-import math
 import random
+import statistics
 from dataclasses import dataclass
+from itertools import groupby
 from typing import List, Optional, Tuple
 
-from twoflags.game import Position, apply_move, generate_moves, winner
+from twoflags.game import Position, Color, W, B, apply_packed_move, winner
 from twoflags.agents.ab_agent import evaluate
+from twoflags.agents.random_agent import choose_random_move
 
 
 # ----------------------------
 # Helpers
 # ----------------------------
-def outcome_value(w: Optional[str]) -> int:
+def outcome_value(w: Optional[Color]) -> int:
     """
     Map terminal winner to numeric label from WHITE perspective:
       WHITE win -> +1
@@ -22,10 +24,9 @@ def outcome_value(w: Optional[str]) -> int:
     """
     if w is None:
         return 0
-    w = w.upper()
-    if w == "W":
+    if w == W:
         return +1
-    if w == "B":
+    if w == B:
         return -1
     return 0
 
@@ -36,18 +37,18 @@ def play_random_to_end(pos: Position, rng: random.Random, max_plies: int) -> int
     Returns +1 if White wins, -1 if Black wins, 0 otherwise.
     """
     p = pos
+    buf: List[int] = []  # move list reused across plies
     for _ in range(max_plies):
         w = winner(p)
         if w is not None:
             return outcome_value(w)
 
-        moves = list(generate_moves(p))
-        if not moves:
+        mv = choose_random_move(p, rng, buf)
+        if mv is None:
             # no legal moves; treat as terminal if winner() didn't
             return outcome_value(winner(p))
 
-        mv = rng.choice(moves)
-        p = apply_move(p, mv)
+        p = apply_packed_move(p, mv)
 
     # hit ply cap: treat as draw/unknown
     return 0
@@ -58,50 +59,44 @@ def randomize_position(rng: random.Random, random_plies: int) -> Position:
     Start from initial position and play 'random_plies' random half-moves.
     """
     p = Position.initial()
+    buf: List[int] = []
     for _ in range(random_plies):
         w = winner(p)
         if w is not None:
             break
-        moves = list(generate_moves(p))
-        if not moves:
+        mv = choose_random_move(p, rng, buf)
+        if mv is None:
             break
-        p = apply_move(p, rng.choice(moves))
+        p = apply_packed_move(p, mv)
     return p
 
 
 def spearman_rank_corr(xs: List[float], ys: List[float]) -> float:
     """
-    Spearman correlation without external libs.
+    Spearman correlation without external libs:
+    Pearson correlation (statistics.correlation) of the average ranks.
     """
     if len(xs) != len(ys) or len(xs) < 2:
         return float("nan")
 
     def rank(a: List[float]) -> List[float]:
-        # average ranks for ties
-        sorted_idx = sorted(range(len(a)), key=lambda i: a[i])
+        # average ranks for ties; equal values are adjacent once sorted
+        order = sorted(range(len(a)), key=a.__getitem__)
         r = [0.0] * len(a)
         i = 0
-        while i < len(a):
-            j = i
-            while j + 1 < len(a) and a[sorted_idx[j + 1]] == a[sorted_idx[i]]:
-                j += 1
-            avg_rank = (i + j) / 2.0 + 1.0
-            for k in range(i, j + 1):
-                r[sorted_idx[k]] = avg_rank
-            i = j + 1
+        for _, grp in groupby(order, key=a.__getitem__):
+            idx = list(grp)
+            avg_rank = i + (len(idx) + 1) / 2.0
+            for k in idx:
+                r[k] = avg_rank
+            i += len(idx)
         return r
 
-    rx = rank(xs)
-    ry = rank(ys)
-
-    mx = sum(rx) / len(rx)
-    my = sum(ry) / len(ry)
-    num = sum((rx[i] - mx) * (ry[i] - my) for i in range(len(rx)))
-    denx = math.sqrt(sum((rx[i] - mx) ** 2 for i in range(len(rx))))
-    deny = math.sqrt(sum((ry[i] - my) ** 2 for i in range(len(ry))))
-    if denx == 0 or deny == 0:
+    try:
+        return statistics.correlation(rank(xs), rank(ys))
+    except statistics.StatisticsError:
+        # one of the inputs is constant
         return float("nan")
-    return num / (denx * deny)
 
 
 @dataclass
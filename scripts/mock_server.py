@@ -4,14 +4,12 @@ import time
 HOST = "127.0.0.1"
 PORT = 5000
 
-def recv_line(conn) -> str:
-    buf = b""
-    while not buf.endswith(b"\n"):
-        chunk = conn.recv(1)
-        if not chunk:
-            raise ConnectionError("client disconnected")
-        buf += chunk
-    return buf.decode("utf-8", errors="replace").strip()
+def recv_line(rfile) -> str:
+    # rfile = conn.makefile("rb"): buffered, so one recv per message, not per byte
+    line = rfile.readline()
+    if not line:
+        raise ConnectionError("client disconnected")
+    return line.decode("utf-8", errors="replace").strip()
 
 def send_line(conn, s: str):
     conn.sendall((s + "\n").encode("utf-8"))
@@ -23,11 +21,11 @@ with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
     print(f"Mock server listening on {HOST}:{PORT}")
 
     conn, addr = s.accept()
-    with conn:
+    with conn, conn.makefile("rb") as rfile:
         print("Client connected:", addr)
 
         # 1) Client should send OK immediately
-        got = recv_line(conn)
+        got = recv_line(rfile)
         print("Got from client:", got)
 
         # 2) Send custom Setup -> expect OK
@@ -35,19 +33,19 @@ with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
         print("Sending:", setup)
         send_line(conn, setup)
 
-        got = recv_line(conn)
+        got = recv_line(rfile)
         print("Got from client:", got)  # should be OK
 
         # 3) Send Time -> expect OK
         send_line(conn, "Time 1")
-        got = recv_line(conn)
+        got = recv_line(rfile)
         print("Got from client:", got)  # should be OK
 
         # 4) Begin -> client must play first (White)
         send_line(conn, "Begin")
 
         # 5) Read client move (White)
-        mv = recv_line(conn)
+        mv = recv_line(rfile)
         print("Client move:", mv)
 
         # 6) Send a LEGAL black move from this setup (e7e6)
@@ -57,7 +55,7 @@ with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
         send_line(conn, black_mv)
 
         # 7) Read client reply
-        mv2 = recv_line(conn)
+        mv2 = recv_line(rfile)
         print("Client reply:", mv2)
 
         # 8) Finish
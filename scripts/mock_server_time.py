@@ -2,7 +2,7 @@ import socket
 import time
 import random
 
-from twoflags.game import Position, apply_move, winner, generate_moves
+from twoflags.game import Position, apply_move, winner, legal_moves, color_to_str
 from twoflags.notation import parse_setup, parse_move_robust, move_to_str_fr
 
 HOST = "127.0.0.1"
@@ -64,7 +64,7 @@ with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
 
         while True:
             if winner(pos) is not None:
-                print("Game ended. Winner:", winner(pos))
+                print("Game ended. Winner:", color_to_str(winner(pos)))
                 conn.sendall(b"exit\n")
                 break
 
@@ -92,12 +92,12 @@ with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
             pos = apply_move(pos, mv)
 
             if winner(pos) is not None:
-                print("Game ended. Winner:", winner(pos))
+                print("Game ended. Winner:", color_to_str(winner(pos)))
                 conn.sendall(b"exit\n")
                 break
 
             # --------- SERVER TURN (opponent move) ----------
-            moves = list(generate_moves(pos))
+            moves = legal_moves(pos)
             if not moves:
                 print("Server has no moves.")
                 conn.sendall(b"exit\n")
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import argparse
+import time
+
+from twoflags.game import Position, perft, generate_packed_moves_into, apply_packed_move, unpack_move
+from twoflags.notation import parse_setup, move_to_str_fr
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Count move sequences (perft) to check and time move generation.")
+    ap.add_argument("--depth", type=int, default=5)
+    ap.add_argument("--setup", type=str, default=None, help='e.g. "Setup Wa2 Wb2 ... Bh7"')
+    ap.add_argument("--ep-capture", action="store_true", help="remove the en-passant victim (search rules)")
+    ap.add_argument("--divide", action="store_true", help="also print the count below each root move")
+    args = ap.parse_args()
+
+    pos = parse_setup(args.setup.split()) if args.setup else Position.initial()
+
+    t0 = time.perf_counter()
+    if args.divide and args.depth > 0:
+        total = 0
+        for m in generate_packed_moves_into(pos, []):
+            n = perft(apply_packed_move(pos, m, args.ep_capture), args.depth - 1, args.ep_capture)
+            print(f"{move_to_str_fr(unpack_move(m))}: {n}")
+            total += n
+    else:
+        total = perft(pos, args.depth, args.ep_capture)
+    dt = time.perf_counter() - t0
+
+    print(f"perft({args.depth}) = {total}")
+    print(f"time: {dt:.3f}s  ({total / dt if dt > 0 else 0:.0f} leaves/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 from __future__ import annotations
 import argparse
-from twoflags.game import Position, apply_move, winner, pretty
+from twoflags.game import Position, apply_move, winner, pretty, color_to_str
 from twoflags.notation import parse_move_robust, parse_setup, move_to_str_fr
 
 def main():
@@ -20,10 +20,11 @@ def main():
         if w is not None:
             print(pretty(pos))
             # print(f"\nGame over. Winner: {w}")
-            print(f"\nGame over. Winner: {w} (reason: pawn reached last rank / no pawns / no moves)")
+            print(f"\nGame over. Winner: {color_to_str(w)} (reason: pawn reached last rank / no pawns / no moves)")
             return
 
-        agent_turn = (args.agent != "none") and (args.agent_side in ("both", pos.turn))
+        side = color_to_str(pos.turn)
+        agent_turn = (args.agent != "none") and (args.agent_side in ("both", side))
         if agent_turn:
             if args.agent == "random":
                 from twoflags.agents.random_agent import choose_move
@@ -31,9 +32,9 @@ def main():
             else:
                 from twoflags.agents.ab_agent import choose_move_iterdeep
                 mv = choose_move_iterdeep(pos, time_budget_sec=args.budget)
-            print(f"[agent {pos.turn}] {move_to_str_fr(mv)}")
+            print(f"[agent {side}] {move_to_str_fr(mv)}")
         else:
-            mv = parse_move_robust(input(f"[{pos.turn}] move> ").strip(), pos)
+            mv = parse_move_robust(input(f"[{side}] move> ").strip(), pos)
 
         pos = apply_move(pos, mv)
 
@@ -1 +1 @@
-from .game import Position, Move, Color
+from .game import Position, Move, Color, W, B
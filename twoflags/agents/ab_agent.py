@@ -2,11 +2,13 @@ from __future__ import annotations
 
 import time
 import random
-import hashlib
 from dataclasses import dataclass
-from typing import Optional, Tuple, Dict
+from typing import Optional, Tuple, List
 
-from ..game import Position, Move, generate_moves, apply_move, winner
+from ..game import (
+    Position, Move, W, MV_EP, RANK_1, RANK_8, legal_moves, generate_packed_moves_into, piece_key,
+    apply_packed_move, unpack_move, has_moves, winner,
+)
 
 EXACT = 0
 LOWER = 1
@@ -15,77 +17,111 @@ UPPER = 2
 
 @dataclass
 class TTEntry:
+    key: int
     depth: int
     value: int
     flag: int
-    best_move: Optional[Move]
+    best_move: Optional[int]  # packed
 
 
-TT: Dict[int, TTEntry] = {}
-TT_MAX_SIZE = 200_000
+# Fixed-size table of TT_SIZE buckets, two slots each: slot 2*i keeps the
+# deepest entry seen for bucket i, slot 2*i+1 is always replaced.
+TT_SIZE = 1 << 18
+TT_MASK = TT_SIZE - 1
+TT: List[Optional[TTEntry]] = [None] * (2 * TT_SIZE)
 
 NODES = 0
 TT_HITS = 0
 TT_STORES = 0
 
+INF = 10**18
+WIN = 10**12
+
+# half-width of the root aspiration window (half a pawn)
+ASPIRATION_DELTA = 50
+
+# best root move (packed) of the last _search_depth call
+ROOT_BEST: Optional[int] = None
+
+# the clock is read once every TIME_CHECK_NODES nodes, not at every node
+TIME_CHECK_NODES = 256
+_NEXT_TIME_CHECK = 0
+
+
+class _Timeout(Exception):
+    """Raised inside the search when the deadline has passed."""
+
+
+# The search works on packed int moves (see game.pack_move); Move objects
+# are only built for the caller of choose_move_iterdeep / _search_depth.
+# One reusable move list per ply of the main search.
+MOVE_STACK: List[List[int]] = [[] for _ in range(65)]
+
+# Quiet-move ordering. KILLERS[ply] holds the last two quiet moves that
+# caused a beta cutoff at that ply (0 = empty, never a real move);
+# HISTORY is indexed by the move's src/dst bits (m & 4095) and gains
+# depth*depth on every quiet cutoff.
+KILLERS: List[List[int]] = [[0, 0] for _ in range(65)]
+HISTORY: List[int] = [0] * (64 * 64)
+
+# sort keys for _negamax, highest first; history scores stay far below these
+ORDER_TT = 1 << 62
+ORDER_CAPTURE = 1 << 61  # MVV-LVA would be a no-op: every piece is a pawn
+ORDER_KILLER = 1 << 60
+
 
 def reset_tt():
-    global TT, NODES, TT_HITS, TT_STORES
-    TT.clear()
+    global NODES, TT_HITS, TT_STORES
+    TT[:] = [None] * (2 * TT_SIZE)
     NODES = 0
     TT_HITS = 0
     TT_STORES = 0
+    reset_move_ordering()
 
 
-_rng = random.Random(1337)
-Z_PIECE = [[_rng.getrandbits(64) for _ in range(64)] for __ in range(2)]
-Z_TURN = _rng.getrandbits(64)
+def reset_move_ordering():
+    for k in KILLERS:
+        k[0] = k[1] = 0
+    HISTORY[:] = [0] * (64 * 64)
 
 
-def _stable_u64_from_obj(x: object) -> int:
-    b = repr(x).encode("utf-8", errors="replace")
-    return int.from_bytes(hashlib.blake2b(b, digest_size=8).digest(), "little", signed=False)
+_rng = random.Random(7331)
+# en-passant target square, and last move indexed by its packed src/dst/ep bits
+# (pawns + side to move are hashed by game.piece_key into pos.zkey)
+Z_EP = [_rng.getrandbits(64) for _ in range(64)]
+Z_LM = [_rng.getrandbits(64) for _ in range(64 * 64 * 2)]
+LM_MASK = (MV_EP << 1) - 1  # src, dst and is_ep bits; is_double is implied
 
 
-def _extract_ep_like_state(pos: Position) -> Optional[object]:
-    for name in (
-        "ep", "ep_sq", "ep_square", "en_passant", "en_passant_sq", "ep_target",
-        "last_move", "last", "prev_move"
-    ):
-        if hasattr(pos, name):
-            v = getattr(pos, name)
-            if v is not None:
-                return v
-    return None
+def _ep_state_key(pos: Position) -> int:
+    if pos.ep_target is not None:
+        return Z_EP[pos.ep_target]
+    lm = pos.last_move
+    if lm is not None:
+        return Z_LM[lm & LM_MASK]
+    return 0
 
 
 def zobrist_key(pos: Position) -> int:
-    k = 0
-    for sq in pos.white:
-        k ^= Z_PIECE[0][sq]
-    for sq in pos.black:
-        k ^= Z_PIECE[1][sq]
-    if pos.turn == "W":
-        k ^= Z_TURN
-
-    extra = _extract_ep_like_state(pos)
-    if extra is not None:
-        if isinstance(extra, Move):
-            k ^= _stable_u64_from_obj(("lm", extra.src, extra.dst, int(getattr(extra, "is_ep", False))))
-        elif isinstance(extra, int) and 0 <= extra < 64:
-            k ^= _stable_u64_from_obj(("ep", extra))
-        else:
-            k ^= _stable_u64_from_obj(("extra", extra))
-
-    return k
-
-
-def _tt_maybe_evict():
-    if len(TT) > TT_MAX_SIZE:
-        TT.clear()
+    # pawns + side to move are kept incrementally in pos.zkey by apply_packed_move
+    k = pos.zkey
+    if k is None:
+        k = pos.zkey = piece_key(pos)
+    return k ^ _ep_state_key(pos)
+
+
+def _tt_lookup(key: int) -> Optional[TTEntry]:
+    i = (key & TT_MASK) << 1
+    entry = TT[i]
+    if entry is not None and entry.key == key:
+        return entry
+    entry = TT[i + 1]
+    if entry is not None and entry.key == key:
+        return entry
+    return None
 
 
-def _tt_store(key: int, depth: int, value: int, alpha0: int, beta0: int, best_move: Optional[Move]):
+def _tt_store(key: int, depth: int, value: int, alpha0: int, beta0: int, best_move: Optional[int]):
     global TT_STORES
     if value <= alpha0:
         flag = UPPER
@@ -94,16 +130,20 @@ def _tt_store(key: int, depth: int, value: int, alpha0: int, beta0: int, best_mo
     else:
         flag = EXACT
 
-    old = TT.get(key)
+    i = (key & TT_MASK) << 1
+    old = TT[i]
     if old is None or depth >= old.depth:
-        TT[key] = TTEntry(depth=depth, value=value, flag=flag, best_move=best_move)
-        TT_STORES += 1
-        _tt_maybe_evict()
+        TT[i] = TTEntry(key=key, depth=depth, value=value, flag=flag, best_move=best_move)
+    elif old.key != key:
+        TT[i + 1] = TTEntry(key=key, depth=depth, value=value, flag=flag, best_move=best_move)
+    else:
+        return
+    TT_STORES += 1
 
 
 def _tt_probe(key: int, depth: int, alpha: int, beta: int) -> Tuple[bool, int, int, Optional[int]]:
     global TT_HITS
-    entry = TT.get(key)
+    entry = _tt_lookup(key)
     if entry is None or entry.depth < depth:
         return (False, alpha, beta, None)
 
@@ -123,47 +163,30 @@ def _tt_probe(key: int, depth: int, alpha: int, beta: int) -> Tuple[bool, int, i
     return (True, alpha, beta, None)
 
 
-def apply_move_fixed(pos: Position, mv: Move) -> Position:
-    mover = pos.turn
-    new_pos = apply_move(pos, mv)
-
-    # EP manual fix
-    try:
-        if getattr(mv, "is_ep", False):
-            cap_sq = mv.dst - 8 if mover == "W" else mv.dst + 8
-            if mover == "W":
-                try:
-                    new_pos.black.discard(cap_sq)
-                except Exception:
-                    pass
-            else:
-                try:
-                    new_pos.white.discard(cap_sq)
-                except Exception:
-                    pass
-    except Exception:
-        pass
-
-    # attach last_move for TT correctness
-    try:
-        setattr(new_pos, "last_move", mv)
-    except Exception:
-        pass
-
-    return new_pos
+# RANK_MASKS[r] = squares on rank index r (0..7).
+# RANK_PLANES[k] = squares whose rank index has bit k set, so the sum of rank
+# indices over a bitboard is sum(2**k * popcount(bb & RANK_PLANES[k])).
+RANK_MASKS = [0xFF << (8 * r) for r in range(8)]
+RANK_PLANES = [sum(m for r, m in enumerate(RANK_MASKS) if (r >> k) & 1) for k in range(3)]
+_RP0, _RP1, _RP2 = RANK_PLANES
 
 
 def evaluate(pos: Position) -> int:
-    w = len(pos.white)
-    b = len(pos.black)
-    w_prog = sum(((sq >> 3) + 1) for sq in pos.white)
-    b_prog = sum((9 - ((sq >> 3) + 1)) for sq in pos.black)
+    white = pos.white
+    black = pos.black
+    w = white.bit_count()
+    b = black.bit_count()
+    w_ranks = (white & _RP0).bit_count() + 2 * (white & _RP1).bit_count() + 4 * (white & _RP2).bit_count()
+    b_ranks = (black & _RP0).bit_count() + 2 * (black & _RP1).bit_count() + 4 * (black & _RP2).bit_count()
+    # progress: white pawn on rank index r scores r+1, black pawn scores 8-r
+    w_prog = w_ranks + w
+    b_prog = 8 * b - b_ranks
     return 100 * (w - b) + 3 * (w_prog - b_prog)
 
 
-def _is_capture(pos: Position, mv: Move) -> bool:
-    opp = pos.black if pos.turn == "W" else pos.white
-    return mv.is_ep or (mv.dst in opp)
+def generate_captures(pos: Position) -> List[int]:
+    opp = (pos.black, pos.white)[pos.turn]
+    return [m for m in generate_packed_moves_into(pos, []) if m & MV_EP or (opp >> ((m >> 6) & 63)) & 1]
 
 
 def compute_time_budget(time_left_sec: Optional[float]) -> float:
@@ -198,127 +221,199 @@ def choose_move_iterdeep(
     deadline = start + budget
 
     best: Optional[Move] = None
+    prev_val: Optional[int] = None
     depth = 1
 
     global NODES
     NODES = 0
+    reset_move_ordering()
 
     while depth <= max_depth:
         if time.perf_counter() >= deadline:
             break
-        mv, _ = _search_depth(pos, depth, deadline)
+
+        # aspiration window around the previous iteration's score; a bound
+        # that fails is opened up and the depth searched again
+        if prev_val is None:
+            lo, hi = -INF, INF
+        else:
+            lo, hi = prev_val - ASPIRATION_DELTA, prev_val + ASPIRATION_DELTA
+        while True:
+            mv, val = _search_depth(pos, depth, deadline, lo, hi)
+            if val is not None and val <= lo:
+                lo = -INF
+            elif val is not None and val >= hi:
+                hi = INF
+                best = mv
+            else:
+                break
+
         if mv is not None:
             best = mv
+        if val is None:
+            break
+        prev_val = val
         depth += 1
 
     if best is None:
-        moves = list(generate_moves(pos))
+        moves = legal_moves(pos)
         if not moves:
             raise RuntimeError("No legal moves.")
         return moves[0]
     return best
 
 
-def _search_depth(pos: Position, depth: int, deadline: float) -> Tuple[Optional[Move], int]:
-    maximizing = (pos.turn == "W")
-    best_mv: Optional[Move] = None
-    best_val = -10**18 if maximizing else 10**18
-
-    moves = list(generate_moves(pos))
-    if not moves:
-        return None, evaluate(pos)
-
-    moves.sort(key=lambda m: 1 if _is_capture(pos, m) else 0, reverse=True)
+def _search_depth(
+    pos: Position,
+    depth: int,
+    deadline: float,
+    alpha: int = -INF,
+    beta: int = INF,
+) -> Tuple[Optional[Move], Optional[int]]:
+    """
+    Root of one iterative-deepening iteration, searched with the window
+    (alpha, beta) given from White's point of view.
+    Returns (best move, value from White's point of view); a value at or
+    outside the window is only a bound.
+    If the deadline hits mid-iteration the value is None and the move is the
+    best among the root moves that were fully searched (None if there are none).
+    """
+    global ROOT_BEST, _NEXT_TIME_CHECK
+    ROOT_BEST = None
+    _NEXT_TIME_CHECK = NODES
+    while len(MOVE_STACK) <= depth:
+        MOVE_STACK.append([])
+        KILLERS.append([0, 0])
+    if pos.turn != W:
+        alpha, beta = -beta, -alpha
+    try:
+        val = _negamax(pos, depth, alpha, beta, deadline, 0)
+    except _Timeout:
+        val = None
+    best = unpack_move(ROOT_BEST) if ROOT_BEST is not None else None
+    if val is None:
+        return best, None
+    return best, (-val if pos.turn else val)
 
-    key = zobrist_key(pos)
-    entry = TT.get(key)
-    if entry is not None and entry.best_move is not None and entry.best_move in moves:
-        moves.remove(entry.best_move)
-        moves.insert(0, entry.best_move)
 
-    alpha, beta = -10**18, 10**18
-    alpha0, beta0 = alpha, beta
+def _check_time(deadline: float) -> None:
+    global _NEXT_TIME_CHECK
+    if time.perf_counter() >= deadline:
+        raise _Timeout()
+    _NEXT_TIME_CHECK = NODES + TIME_CHECK_NODES
 
-    for mv in moves:
-        if time.perf_counter() >= deadline:
-            break
 
-        val = _alphabeta(apply_move_fixed(pos, mv), depth - 1, alpha, beta, deadline)
+def _negamax(pos: Position, depth: int, alpha: int, beta: int, deadline: float, ply: int) -> int:
+    """
+    Fail-soft alpha-beta in negamax form: values are from the side to move's
+    point of view. At ply 0 the best move is left in ROOT_BEST.
+    Raises _Timeout once the deadline has passed; nothing half-searched is
+    stored in the TT on the way out.
+    """
+    global NODES, ROOT_BEST
+    NODES += 1
+    if NODES >= _NEXT_TIME_CHECK:
+        _check_time(deadline)
+
+    if ply:
+        # terminal checks of winner(), inlined as mask tests; "no moves"
+        # is caught below once the move list is generated
+        if pos.white & RANK_8 or not pos.black:
+            return -WIN if pos.turn else WIN
+        if pos.black & RANK_1 or not pos.white:
+            return WIN if pos.turn else -WIN
+
+        if depth <= 0:
+            if not has_moves(pos):
+                return -WIN
+            return _quiescence(pos, alpha, beta, deadline)
 
-        if maximizing:
-            if val > best_val:
-                best_val, best_mv = val, mv
-            alpha = max(alpha, best_val)
+    key = zobrist_key(pos)
+    alpha0, beta0 = alpha, beta
+    if ply:
+        _, alpha, beta, exact_val = _tt_probe(key, depth, alpha, beta)
+        if exact_val is not None:
+            return exact_val
+
+    moves = MOVE_STACK[ply]
+    moves.clear()
+    generate_packed_moves_into(pos, moves)
+    if not moves:
+        # no moves = lose
+        return -WIN
+
+    # TT move, then captures, then killers, then quiet moves by history
+    opp = (pos.black, pos.white)[pos.turn]
+    entry = _tt_lookup(key)
+    tt_mv = entry.best_move if entry is not None else None
+    killers = KILLERS[ply]
+    k0, k1 = killers
+    moves.sort(
+        key=lambda m: ORDER_TT if m == tt_mv else (
+            ORDER_CAPTURE if m & MV_EP or (opp >> ((m >> 6) & 63)) & 1 else (
+                ORDER_KILLER if m == k0 or m == k1 else HISTORY[m & 4095]
+            )
+        ),
+        reverse=True,
+    )
+
+    # principal variation search: full window for the first move, null
+    # window for the rest, re-searching only the ones that fail high
+    best_move: Optional[int] = None
+    v = -INF
+    for i, mv in enumerate(moves):
+        child_pos = apply_packed_move(pos, mv, True)
+        if i == 0:
+            child = -_negamax(child_pos, depth - 1, -beta, -alpha, deadline, ply + 1)
         else:
-            if val < best_val:
-                best_val, best_mv = val, mv
-            beta = min(beta, best_val)
-
-        if beta <= alpha:
+            child = -_negamax(child_pos, depth - 1, -alpha - 1, -alpha, deadline, ply + 1)
+            if alpha < child < beta:
+                child = -_negamax(child_pos, depth - 1, -beta, -child, deadline, ply + 1)
+        if child > v:
+            v = child
+            best_move = mv
+            if not ply:
+                ROOT_BEST = mv
+        alpha = max(alpha, v)
+        if alpha >= beta:
+            if not (mv & MV_EP or (opp >> ((mv >> 6) & 63)) & 1):
+                if mv != killers[0]:
+                    killers[1] = killers[0]
+                    killers[0] = mv
+                HISTORY[mv & 4095] += depth * depth
             break
 
-    _tt_store(key, depth, best_val, alpha0, beta0, best_mv)
-    return best_mv, best_val
+    _tt_store(key, depth, v, alpha0, beta0, best_move)
+    return v
 
 
-def _alphabeta(pos: Position, depth: int, alpha: int, beta: int, deadline: float) -> int:
+def _quiescence(pos: Position, alpha: int, beta: int, deadline: float) -> int:
+    """
+    Capture-only search below the horizon (negamax, side-to-move values).
+    The side to move may always stand pat on the static evaluation.
+    pos itself is assumed not to be terminal.
+    """
     global NODES
     NODES += 1
+    if NODES >= _NEXT_TIME_CHECK:
+        _check_time(deadline)
 
-    if time.perf_counter() >= deadline:
-        return evaluate(pos)
-
-    w = winner(pos)
-    if w is not None:
-        return 10**12 if w == "W" else -10**12
-
-    if depth <= 0:
-        return evaluate(pos)
-
-    key = zobrist_key(pos)
-    alpha0, beta0 = alpha, beta
-    _, alpha, beta, exact_val = _tt_probe(key, depth, alpha, beta)
-    if exact_val is not None:
-        return exact_val
-
-    maximizing = (pos.turn == "W")
-    moves = list(generate_moves(pos))
-    if not moves:
-        return evaluate(pos)
-
-    moves.sort(key=lambda m: 1 if _is_capture(pos, m) else 0, reverse=True)
-    entry = TT.get(key)
-    if entry is not None and entry.best_move is not None and entry.best_move in moves:
-        moves.remove(entry.best_move)
-        moves.insert(0, entry.best_move)
-
-    best_move: Optional[Move] = None
+    v = -evaluate(pos) if pos.turn else evaluate(pos)
+    if v >= beta:
+        return v
+    alpha = max(alpha, v)
 
-    if maximizing:
-        v = -10**18
-        for mv in moves:
-            if time.perf_counter() >= deadline:
-                break
-            child = _alphabeta(apply_move_fixed(pos, mv), depth - 1, alpha, beta, deadline)
-            if child > v:
-                v = child
-                best_move = mv
+    for mv in generate_captures(pos):
+        child = apply_packed_move(pos, mv, True)
+        w = winner(child)
+        if w is not None:
+            score = WIN if w == pos.turn else -WIN
+        else:
+            score = -_quiescence(child, -beta, -alpha, deadline)
+        if score > v:
+            v = score
             alpha = max(alpha, v)
-            if beta <= alpha:
-                break
-        _tt_store(key, depth, v, alpha0, beta0, best_move)
-        return v
-    else:
-        v = 10**18
-        for mv in moves:
-            if time.perf_counter() >= deadline:
-                break
-            child = _alphabeta(apply_move_fixed(pos, mv), depth - 1, alpha, beta, deadline)
-            if child < v:
-                v = child
-                best_move = mv
-            beta = min(beta, v)
-            if beta <= alpha:
+            if alpha >= beta:
                 break
-        _tt_store(key, depth, v, alpha0, beta0, best_move)
-        return v
+
+    return v
@@ -1,11 +1,25 @@
 from __future__ import annotations
 import random
-from typing import Optional
-from ..game import Position, Move, generate_moves
+from typing import List, Optional
+from ..game import Position, Move, generate_packed_moves_into, unpack_move
+
+def choose_random_move(pos: Position, rng: random.Random, buf: Optional[List[int]] = None) -> Optional[int]:
+    """
+    Uniformly random legal move of pos as a packed int (None if there is none).
+    Pass the same buf on every call to reuse it instead of allocating a list.
+    """
+    if buf is None:
+        buf = []
+    else:
+        buf.clear()
+    generate_packed_moves_into(pos, buf)
+    if not buf:
+        return None
+    return rng.choice(buf)
 
 def choose_move(pos: Position, rng: Optional[random.Random] = None) -> Move:
     rng = rng or random.Random()
-    moves = list(generate_moves(pos))
-    if not moves:
+    m = choose_random_move(pos, rng)
+    if m is None:
         raise RuntimeError("No legal moves.")
-    return rng.choice(moves)
+    return unpack_move(m)
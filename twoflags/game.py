@@ -1,9 +1,12 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Optional, Iterable, List, Set, Literal, Tuple
+import random
+from dataclasses import dataclass, field
+from typing import Optional, List, NamedTuple, Tuple
 
-Color = Literal["W", "B"]
+Color = int  # W or B
+W = 0
+B = 1
 FILES = "abcdefgh"
 
 
@@ -23,6 +26,10 @@ def sq_index(file_idx: int, rank: int) -> int:
     return (rank - 1) * 8 + file_idx
 
 
+def color_to_str(c: Color) -> str:
+    return "WB"[c]
+
+
 def square_to_fr(sq: Optional[int]) -> Optional[str]:
     if sq is None:
         return None
@@ -36,46 +43,90 @@ def fr_to_square(fr: str) -> int:
     fr = fr.strip()
     if len(fr) != 2:
         raise ValueError(f"Bad square: {fr!r}")
-    f = FILES.find(fr[0])
-    if f < 0:
+    f, r = fr
+    if not "a" <= f <= "h":
         raise ValueError(f"Bad file: {fr!r}")
-    if fr[1] < "1" or fr[1] > "8":
+    if not "1" <= r <= "8":
         raise ValueError(f"Bad rank: {fr!r}")
-    r = int(fr[1])
-    return sq_index(f, r)
+    return (ord(r) - 49) * 8 + ord(f) - 97
 
 
 # =========================
 # Move + Position
 # =========================
-@dataclass(frozen=True)
-class Move:
+class Move(NamedTuple):
+    """
+    Public move type; hashed and compared as a plain tuple.
+    The search itself uses packed ints (see pack_move).
+    """
     src: int
     dst: int
     is_ep: bool = False
     is_double: bool = False
 
 
+# Packed move (hot paths): src | dst << 6 | MV_EP | MV_DOUBLE
+MV_EP = 1 << 12
+MV_DOUBLE = 1 << 13
+
+
+def pack_move(mv: Move) -> int:
+    return mv.src | (mv.dst << 6) | (MV_EP if mv.is_ep else 0) | (MV_DOUBLE if mv.is_double else 0)
+
+
+def unpack_move(m: int) -> Move:
+    return Move(m & 63, (m >> 6) & 63, bool(m & MV_EP), bool(m & MV_DOUBLE))
+
+
+# =========================
+# Zobrist hashing
+# =========================
+_zrng = random.Random(1337)
+# flat table indexed by color*64 + sq (0 = white, 1 = black)
+Z_PIECE = [_zrng.getrandbits(64) for _ in range(2 * 64)]
+Z_TURN = _zrng.getrandbits(64)
+
+
+def piece_key(pos: "Position") -> int:
+    k = 0
+    bb = pos.white
+    while bb:
+        lsb = bb & -bb
+        k ^= Z_PIECE[lsb.bit_length() - 1]
+        bb ^= lsb
+    bb = pos.black
+    while bb:
+        lsb = bb & -bb
+        k ^= Z_PIECE[64 + lsb.bit_length() - 1]
+        bb ^= lsb
+    if pos.turn == W:
+        k ^= Z_TURN
+    return k
+
+
 @dataclass
 class Position:
-    white: Set[int]
-    black: Set[int]
-    turn: Color = "W"
+    white: int  # bitboard: bit sq set <=> white pawn on sq
+    black: int  # bitboard: bit sq set <=> black pawn on sq
+    turn: Color = W
     ep_target: Optional[int] = None  # passed-over square, valid for one ply
+    zkey: Optional[int] = field(default=None, repr=False, compare=False)  # Zobrist hash of pawns + side to move (see piece_key)
+    last_move: Optional[int] = field(default=None, repr=False, compare=False)  # packed move that produced this position
+    move_cache: Optional[List["Move"]] = field(default=None, repr=False, compare=False)  # see legal_moves
 
     @staticmethod
     def initial() -> "Position":
-        w = {sq_index(f, 2) for f in range(8)}
-        b = {sq_index(f, 7) for f in range(8)}
-        return Position(white=w, black=b, turn="W", ep_target=None)
+        w = 0xFF << sq_index(0, 2)
+        b = 0xFF << sq_index(0, 7)
+        return Position(white=w, black=b, turn=W, ep_target=None)
 
     @staticmethod
-    def from_setup_tokens(tokens: List[str], turn: Color = "W") -> "Position":
+    def from_setup_tokens(tokens: List[str], turn: Color = W) -> "Position":
         """
         tokens like: ["Wa2","Wb2",...,"Ba7",...]
         """
-        w: Set[int] = set()
-        b: Set[int] = set()
+        w = 0
+        b = 0
         for t in tokens:
             t = t.strip()
             if len(t) < 3:
@@ -83,15 +134,15 @@ class Position:
             side = t[0]
             sq = fr_to_square(t[1:])
             if side == "W":
-                w.add(sq)
+                w |= 1 << sq
             elif side == "B":
-                b.add(sq)
+                b |= 1 << sq
             else:
                 raise ValueError(f"Bad setup token: {t!r}")
         return Position(white=w, black=b, turn=turn, ep_target=None)
 
     @staticmethod
-    def from_setup_line(line: str, turn: Color = "W") -> "Position":
+    def from_setup_line(line: str, turn: Color = W) -> "Position":
         """
         line like: "Setup Wa2 Wb2 ... Bh7"
         """
@@ -101,176 +152,262 @@ class Position:
         return Position.from_setup_tokens(parts[1:], turn=turn)
 
     def clone(self) -> "Position":
-        return Position(set(self.white), set(self.black), self.turn, self.ep_target)
+        # board state only: callers clone in order to edit the copy, so a
+        # cached zkey could go stale; last_move is history, not state
+        return Position(self.white, self.black, self.turn, self.ep_target)
 
-    def occupied(self) -> Set[int]:
+    def occupied(self) -> int:
         return self.white | self.black
 
 
 # =========================
 # Game rules
 # =========================
+BB_ALL = (1 << 64) - 1
+FILE_A = 0x0101010101010101
+FILE_H = FILE_A << 7
+RANK_1 = 0xFF
+RANK_3 = 0xFF << 16
+RANK_6 = 0xFF << 40
+RANK_8 = 0xFF << 56
+
+# XXX_ATTACKS[sq] = squares a pawn of that colour on sq captures on. Read
+# backwards, BLACK_ATTACKS[sq] is also where a white pawn attacking sq stands.
+WHITE_ATTACKS = [0] * 64
+BLACK_ATTACKS = [0] * 64
+for _sq in range(64):
+    _f, _r = _sq & 7, _sq >> 3
+    if _r < 7 and _f > 0:
+        WHITE_ATTACKS[_sq] |= 1 << (_sq + 7)
+    if _r < 7 and _f < 7:
+        WHITE_ATTACKS[_sq] |= 1 << (_sq + 9)
+    if _r > 0 and _f > 0:
+        BLACK_ATTACKS[_sq] |= 1 << (_sq - 9)
+    if _r > 0 and _f < 7:
+        BLACK_ATTACKS[_sq] |= 1 << (_sq - 7)
+del _sq, _f, _r
+
+
 def winner(pos: Position) -> Optional[Color]:
     # reach last rank
-    if any((sq >> 3) == 7 for sq in pos.white):  # rank 8
-        return "W"
-    if any((sq >> 3) == 0 for sq in pos.black):  # rank 1
-        return "B"
+    if pos.white & RANK_8:
+        return W
+    if pos.black & RANK_1:
+        return B
 
     # wipeout
     if not pos.black:
-        return "W"
+        return W
     if not pos.white:
-        return "B"
+        return B
 
     # no moves = lose
-    if not any(True for _ in generate_moves(pos)):
-        return "B" if pos.turn == "W" else "W"
+    if not has_moves(pos):
+        return pos.turn ^ 1
 
     return None
 
 
-def generate_moves(pos: Position) -> Iterable[Move]:
+def has_moves(pos: Position) -> bool:
+    """
+    Early-exit test for "side to move has at least one legal move",
+    using whole-board shifts instead of generating the move list.
+    """
+    empty = ~(pos.white | pos.black) & BB_ALL
+    if pos.turn == W:
+        pawns, opp = pos.white, pos.black
+        if (pawns << 8) & empty:
+            return True
+        if (((pawns & ~FILE_A) << 7) | ((pawns & ~FILE_H) << 9)) & opp:
+            return True
+    else:
+        pawns, opp = pos.black, pos.white
+        if (pawns >> 8) & empty:
+            return True
+        if (((pawns & ~FILE_A) >> 9) | ((pawns & ~FILE_H) >> 7)) & opp:
+            return True
+    # only an en-passant capture can be left: the target must be empty, have
+    # the double-stepped pawn behind it and be attacked by one of our pawns
+    ep = pos.ep_target
+    if ep is None or not (empty >> ep) & 1:
+        return False
+    if pos.turn == W:
+        return bool((opp >> (ep - 8)) & 1 and BLACK_ATTACKS[ep] & pawns)
+    return bool((opp >> (ep + 8)) & 1 and WHITE_ATTACKS[ep] & pawns)
+
+
+def generate_moves(pos: Position) -> List[Move]:
     """
     Pawn-only:
       - forward 1
       - forward 2 from start rank (creates ep_target)
       - diagonal capture
       - en passant capture to ep_target
-    Deterministic order for reproducibility.
+    Deterministic order, best-first for alpha-beta: all captures (left,
+    then right), then en passant captures, then double pushes, then single
+    pushes; ascending destination square within each group.
+    """
+    return [unpack_move(m) for m in generate_packed_moves_into(pos, [])]
+
+
+def legal_moves(pos: Position) -> List[Move]:
+    """
+    generate_moves(pos), computed once per Position and cached on it.
+    Positions are never edited in place (apply_move builds a new one), so
+    the cache needs no invalidation. The list is shared: do not modify it.
     """
-    occ = pos.occupied()
+    moves = pos.move_cache
+    if moves is None:
+        moves = pos.move_cache = generate_moves(pos)
+    return moves
+
 
-    if pos.turn == "W":
+def generate_packed_moves_into(pos: Position, out: List[int]) -> List[int]:
+    """
+    Append the moves of generate_moves(pos) to out as packed ints, in the
+    same order, and return out. Lets the search reuse one list per ply.
+
+    Targets are computed for all pawns at once with whole-board shifts, then
+    emitted by category in the order documented on generate_moves.
+    """
+    add = out.append
+    empty = ~(pos.white | pos.black) & BB_ALL
+
+    # EP target as a bitboard, only if the double-stepped pawn is behind it
+    ep = pos.ep_target
+    ep_bb = 0
+    if pos.turn == W:
         pawns, opp = pos.white, pos.black
-        fwd, start_rank = 8, 2
-        cap_deltas = (7, 9)      # left then right
-        ep_deltas = (7, 9)
+        fwd, left, right = 8, 7, 9
+        if ep is not None and (opp >> (ep - 8)) & 1:
+            ep_bb = (1 << ep) & empty
+        single = (pawns << 8) & empty
+        double = ((single & RANK_3) << 8) & empty
+        caps_l = (pawns & ~FILE_A) << 7
+        caps_r = (pawns & ~FILE_H) << 9
     else:
         pawns, opp = pos.black, pos.white
-        fwd, start_rank = -8, 7
-        cap_deltas = (-9, -7)    # left then right (from Black POV)
-        ep_deltas = (-9, -7)
-
-    for src in sorted(pawns):
-        r = rank_of(src)
-        f = file_of(src)
-
-        # forward 1
-        dst1 = src + fwd
-        if 0 <= dst1 < 64 and dst1 not in occ:
-            yield Move(src, dst1)
-
-            # forward 2 from start
-            if r == start_rank:
-                dst2 = src + 2 * fwd
-                mid = src + fwd
-                if 0 <= dst2 < 64 and mid not in occ and dst2 not in occ:
-                    yield Move(src, dst2, is_double=True)
-
-        # captures
-        for d in cap_deltas:
-            dst = src + d
-            if 0 <= dst < 64 and abs(file_of(dst) - f) == 1:
-                if dst in opp:
-                    yield Move(src, dst)
-
-        # en passant
-        if pos.ep_target is not None:
-            ep = pos.ep_target
-            for d in ep_deltas:
-                dst = src + d
-                if dst == ep and 0 <= dst < 64 and abs(file_of(dst) - f) == 1:
-                    cap_sq = dst - fwd  # square of the pawn that moved 2
-                    if cap_sq in opp and dst not in occ:
-                        yield Move(src, dst, is_ep=True)
+        fwd, left, right = -8, -9, -7  # left/right from White's view
+        if ep is not None and (opp >> (ep + 8)) & 1:
+            ep_bb = (1 << ep) & empty
+        single = (pawns >> 8) & empty
+        double = ((single & RANK_6) >> 8) & empty
+        caps_l = (pawns & ~FILE_A) >> 9
+        caps_r = (pawns & ~FILE_H) >> 7
+
+    for targets, delta, flags in (
+        (caps_l & opp, left, 0),
+        (caps_r & opp, right, 0),
+        (caps_l & ep_bb, left, MV_EP),
+        (caps_r & ep_bb, right, MV_EP),
+        (double, 2 * fwd, MV_DOUBLE),
+        (single, fwd, 0),
+    ):
+        while targets:
+            lsb = targets & -targets
+            targets ^= lsb
+            dst = lsb.bit_length() - 1
+            add((dst - delta) | dst << 6 | flags)
+
+    return out
+
+
+def perft(pos: Position, depth: int, ep_capture: bool = False) -> int:
+    """
+    Number of move sequences of length depth from pos, for checking and
+    timing move generation. Finished games are not expanded further.
+    ep_capture is passed on to apply_packed_move.
+    """
+    if depth == 0:
+        return 1
+    if winner(pos) is not None:
+        return 0
+    moves = generate_packed_moves_into(pos, [])
+    if depth == 1:
+        return len(moves)
+    return sum(perft(apply_packed_move(pos, m, ep_capture), depth - 1, ep_capture) for m in moves)
 
 
 def infer_move(pos: Position, src: int, dst: int) -> Move:
     """
     Given a src/dst (from UCI), infer is_double / is_ep from the current position.
     """
-    occ = pos.occupied()
-    mover = pos.white if pos.turn == "W" else pos.black
-    if src not in mover:
-        raise ValueError("src is not a pawn of side-to-move")
+    return unpack_move(infer_packed_move(pos, src, dst))
 
-    fwd = 8 if pos.turn == "W" else -8
-    start_rank = 2 if pos.turn == "W" else 7
 
-    is_double = False
-    if dst - src == 2 * fwd and rank_of(src) == start_rank:
+def infer_packed_move(pos: Position, src: int, dst: int) -> int:
+    """
+    infer_move as a packed int, for callers that apply it straight away.
+    """
+    # start_row is sq >> 3 of the double-step rank (rank 2 / rank 7)
+    if pos.turn == W:
+        mover, fwd, start_row, attacks = pos.white, 8, 1, WHITE_ATTACKS
+    else:
+        mover, fwd, start_row, attacks = pos.black, -8, 6, BLACK_ATTACKS
+    if not (mover >> src) & 1:
+        raise ValueError("src is not a pawn of side-to-move")
+    occ = pos.white | pos.black
+
+    m = src | dst << 6
+    if dst - src == 2 * fwd and src >> 3 == start_row:
         # basic path sanity
-        mid = src + fwd
-        if mid not in occ and dst not in occ:
-            is_double = True
+        if not (occ >> (src + fwd)) & 1 and not (occ >> dst) & 1:
+            m |= MV_DOUBLE
 
-    is_ep = False
-    if pos.ep_target is not None and dst == pos.ep_target:
+    if dst == pos.ep_target:
         # EP destination is empty; capture pawn behind it
-        if dst not in occ and abs(file_of(dst) - file_of(src)) == 1:
-            is_ep = True
-
-    return Move(src, dst, is_ep=is_ep, is_double=is_double)
+        if not (occ >> dst) & 1 and (attacks[src] >> dst) & 1:
+            m |= MV_EP
 
+    return m
 
-# def apply_move(pos: Position, mv: Move) -> Position:
-#     newp = pos.clone()
-
-#     mover = newp.white if newp.turn == "W" else newp.black
-#     opp = newp.black if newp.turn == "W" else newp.white
-#     fwd = 8 if newp.turn == "W" else -8
-
-#     newp.ep_target = None
-#     mover.remove(mv.src)
-
-#     # normal capture
-#     if mv.dst in opp:
-#         opp.remove(mv.dst)
-
-#     # en passant capture
-#     if mv.is_ep:
-#         cap_sq = mv.dst - fwd
-#         if cap_sq in opp:
-#             opp.remove(cap_sq)
-
-#     mover.add(mv.dst)
-
-#     # create ep target after double
-#     if mv.is_double:
-#         newp.ep_target = mv.src + fwd
-
-#     newp.turn = "B" if newp.turn == "W" else "W"
-#     return newp
 
 def apply_move(pos: Position, mv: Move) -> Position:
-    newp = pos.clone()
-
-    mover = newp.white if newp.turn == "W" else newp.black
-    opp = newp.black if newp.turn == "W" else newp.white
-    fwd = 8 if newp.turn == "W" else -8
+    return apply_packed_move(pos, pack_move(mv))
 
-    # EP target is only valid for one ply
-    newp.ep_target = None
 
-    mover.remove(mv.src)
+def apply_packed_move(pos: Position, m: int, ep_capture: bool = False) -> Position:
+    src = m & 63
+    dst = (m >> 6) & 63
+    src_bit = 1 << src
+    dst_bit = 1 << dst
+    mover = pos.turn
+    if mover == W:
+        own_bb, opp_bb, fwd = pos.white, pos.black, 8
+    else:
+        own_bb, opp_bb, fwd = pos.black, pos.white, -8
 
-    # normal capture (only if destination is occupied)
-    if mv.dst in opp:
-        opp.remove(mv.dst)
+    # move the pawn; normal capture clears the destination on the other side
+    own_bb ^= src_bit | dst_bit  # src is ours, dst is never ours
+    captured = opp_bb & dst_bit
+    opp_bb ^= captured
 
     # COMPAT MODE (ChessNet):
-    # If mv.is_ep, DO NOT remove the "passed" pawn (cap_sq).
+    # If the move is en passant, DO NOT remove the "passed" pawn (cap_sq).
     # This keeps our internal state aligned with ChessNet's behavior.
-
-    mover.add(mv.dst)
-
-    # create ep target after double-step
-    if mv.is_double:
-        newp.ep_target = mv.src + fwd
-
-    newp.turn = "B" if newp.turn == "W" else "W"
-    return newp
+    # The search plays real en passant instead (ep_capture=True).
+    ep_victim = 0
+    if ep_capture and m & MV_EP:
+        ep_victim = opp_bb & (1 << (dst - fwd))
+        opp_bb ^= ep_victim
+
+    # The EP target is only valid for one ply; a double-step creates a new one.
+    ep_target = src + fwd if m & MV_DOUBLE else None
+
+    # keep the Zobrist key incremental once it has been computed
+    k = pos.zkey
+    if k is not None:
+        own = mover * 64
+        opp = 64 - own
+        k ^= Z_PIECE[own + src] ^ Z_PIECE[own + dst] ^ Z_TURN
+        if captured:
+            k ^= Z_PIECE[opp + dst]
+        if ep_victim:
+            k ^= Z_PIECE[opp + dst - fwd]
+
+    if mover == W:
+        return Position(own_bb, opp_bb, B, ep_target, k, m)
+    return Position(opp_bb, own_bb, W, ep_target, k, m)
 
 
 # =========================
@@ -289,8 +426,7 @@ def move_to_uci(mv: Move) -> str:
 
 def apply_uci(pos: Position, uci: str) -> Position:
     src, dst = uci_to_src_dst(uci)
-    mv = infer_move(pos, src, dst)
-    return apply_move(pos, mv)
+    return apply_packed_move(pos, infer_packed_move(pos, src, dst))
 
 
 def pretty(pos: Position) -> str:
@@ -299,9 +435,9 @@ def pretty(pos: Position) -> str:
         row = []
         for f in range(8):
             sq = sq_index(f, r)
-            row.append("W" if sq in pos.white else "B" if sq in pos.black else ".")
+            row.append("W" if (pos.white >> sq) & 1 else "B" if (pos.black >> sq) & 1 else ".")
         rows.append(f"{r} " + " ".join(row))
     rows.append("  " + " ".join(list(FILES)))
     ep = square_to_fr(pos.ep_target) if pos.ep_target is not None else None
-    rows.append(f"turn={pos.turn} ep_target={ep}")
+    rows.append(f"turn={color_to_str(pos.turn)} ep_target={ep}")
     return "\n".join(rows)
@@ -1,56 +1,53 @@
 from __future__ import annotations
 
-import re
 from typing import List
 
-from .game import Position, Move, FILES, sq_index, file_of, rank_of, generate_moves
+from .game import Position, Move, W, legal_moves, move_to_uci
 
-_SQ_RE = re.compile(r"^[a-h][1-8]$|^[1-8][a-h]$", re.IGNORECASE)
+# separators dropped from move strings ("a2-a4", "a2->a4", "a2 a4")
+_MOVE_SEP_DEL = str.maketrans("", "", "-> ")
 
 def parse_square(token: str) -> int:
     t = token.strip().lower()
-    if not _SQ_RE.match(t):
-        raise ValueError(f"Bad square token: {token!r}")
-    if t[0].isalpha():  # a2
-        file_ch, rank_ch = t[0], t[1]
-    else:               # 2a
-        rank_ch, file_ch = t[0], t[1]
-    return sq_index(FILES.index(file_ch), int(rank_ch))
+    if len(t) == 2:
+        c0, c1 = t
+        if "a" <= c0 <= "h" and "1" <= c1 <= "8":  # a2
+            return (ord(c1) - 49) * 8 + ord(c0) - 97
+        if "1" <= c0 <= "8" and "a" <= c1 <= "h":  # 2a
+            return (ord(c0) - 49) * 8 + ord(c1) - 97
+    raise ValueError(f"Bad square token: {token!r}")
 
-def square_to_fr(sq: int) -> str:
-    return f"{FILES[file_of(sq)]}{rank_of(sq)}"
-
-def move_to_str_fr(mv: Move) -> str:
-    return square_to_fr(mv.src) + square_to_fr(mv.dst)
+# "a2a4"-style move text is the same as UCI; one canonical implementation
+move_to_str_fr = move_to_uci
 
 def parse_setup(tokens: List[str]) -> Position:
     if not tokens or tokens[0].lower() != "setup":
         raise ValueError("setup must start with 'Setup'")
-    w, b = set(), set()
+    w = b = 0
     for tok in tokens[1:]:
         t = tok.strip()
         if len(t) != 3:
             raise ValueError(f"Bad setup token: {tok!r}")
         col = t[0].upper()
         sq = parse_square(t[1:3])
-        (w if col == "W" else b if col == "B" else None)
         if col == "W":
-            w.add(sq)
+            w |= 1 << sq
         elif col == "B":
-            b.add(sq)
+            b |= 1 << sq
         else:
             raise ValueError(f"Bad color in setup token: {tok!r}")
-    return Position(white=w, black=b, turn="W", ep_target=None)
+    return Position(white=w, black=b, turn=W, ep_target=None)
 
 def parse_move_robust(s: str, pos: Position) -> Move:
-    raw = s.strip().lower().replace("->", "").replace("-", "").replace(" ", "")
+    raw = s.strip().lower().translate(_MOVE_SEP_DEL)
     if len(raw) != 4:
         raise ValueError(f"Bad move string: {s!r}")
-    a, b = raw[:2], raw[2:]
-    cands = [(parse_square(a), parse_square(b)), (parse_square(b), parse_square(a))]
-    legal = {(m.src, m.dst, m.is_ep, m.is_double) for m in generate_moves(pos)}
-    for src, dst in cands:
-        for (lsrc, ldst, lep, ldbl) in legal:
-            if lsrc == src and ldst == dst:
-                return Move(src, dst, is_ep=lep, is_double=ldbl)
+    sa = parse_square(raw[:2])
+    sb = parse_square(raw[2:])
+    cands = ((sa, sb), (sb, sa))
+    legal = {(m.src, m.dst): m for m in legal_moves(pos)}
+    for cand in cands:
+        mv = legal.get(cand)
+        if mv is not None:
+            return mv
     raise ValueError(f"Illegal move {s!r} for current position.")